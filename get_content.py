@@ -2,97 +2,288 @@
 
 You can use other parsers as well.
 """
-from typing import List, Dict
+from typing import BinaryIO, List, Dict, Optional
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
 import hashlib
-import json
-import time
+import queue
+import shutil
+import sqlite3
+import tempfile
+import threading
 import requests
-from requests.exceptions import RequestException, Timeout, ConnectionError
+from requests.adapters import HTTPAdapter
+from requests.exceptions import RequestException
+from urllib3.exceptions import HTTPError as Urllib3HTTPError
+from urllib3.util import Retry
+import zstandard as zstd
 from aryn_sdk.partition import partition_file
 
+# Retry transient failures with exponential backoff (0.5s, 1s, 2s), honoring
+# Retry-After on 429/503.
+_RETRY = Retry(
+    total=3,
+    backoff_factor=0.5,
+    status_forcelist=(429, 500, 502, 503, 504),
+    allowed_methods=frozenset(["GET"]),
+    respect_retry_after_header=True,
+)
+
+# Shared session so downloads reuse keep-alive connections (most PDFs come
+# from the same host). Downloads are capped at the pool size so every download
+# thread can keep its connection alive.
+_POOL_SIZE = 16
+_SESSION = requests.Session()
+_ADAPTER = HTTPAdapter(pool_connections=_POOL_SIZE, pool_maxsize=_POOL_SIZE, max_retries=_RETRY)
+_SESSION.mount("https://", _ADAPTER)
+_SESSION.mount("http://", _ADAPTER)
+
+# Cached markdown is stored zstd-compressed; parsed papers compress several
+# times over, which keeps the cache database small and quick to read.
+_CCTX = zstd.ZstdCompressor(level=3)
+_DCTX = zstd.ZstdDecompressor()
+
+# Circuit breaker for Aryn: after this many consecutive parse failures, skip
+# parsing for a while instead of waiting on every remaining call to fail.
+_ARYN_MAX_FAILURES = 3
+_ARYN_RESET_SECONDS = 60
+_aryn_failures = 0
+_aryn_lock = threading.Lock()
+_ARYN_TRIPPED = threading.Event()
+
+
+def _open_cache(cache_dir: str) -> sqlite3.Connection:
+    """Opens (and creates if needed) the markdown cache database in `cache_dir`."""
+    cache_path = Path(cache_dir)
+    cache_path.mkdir(exist_ok=True)
+
+    conn = sqlite3.connect(cache_path / "cache.db")
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS md "
+        "(url_hash BLOB PRIMARY KEY, markdown BLOB) WITHOUT ROWID"
+    )
+    return conn
+
+
+def _url_key(url: str) -> bytes:
+    """Returns the cache key for a URL."""
+    return hashlib.blake2b(url.encode(), digest_size=16).digest()
+
+
+def _download(url: str, ready: queue.Queue) -> None:
+    """Downloads a single PDF and puts `(url, pdf)` on the `ready` queue.
+
+    Args:
+        url: URL pointing to a PDF file.
+        ready: Queue of downloaded PDFs waiting to be parsed. `pdf` is None if
+            the download failed.
+    """
+    # Stream the PDF into a temporary file on disk instead of holding the whole
+    # response body in memory. (A SpooledTemporaryFile would not help: the
+    # Aryn upload calls fileno(), which rolls it over to disk anyway.)
+    pdf = tempfile.TemporaryFile()
+    downloaded = False
+    try:
+        # 5 second connect timeout, 60 second read timeout
+        with _SESSION.get(url, stream=True, timeout=(5, 60)) as response:
+            if response.status_code >= 400:
+                response.raise_for_status()
+            response.raw.decode_content = True
+            shutil.copyfileobj(response.raw, pdf)
+        pdf.seek(0)
+        downloaded = True
+    except (RequestException, Urllib3HTTPError) as e:
+        # Errors while reading response.raw come straight from urllib3
+        # (e.g. ProtocolError, ReadTimeoutError), not wrapped by requests.
+        print(f"Request error processing {url}: {str(e)}")
+    except Exception as e:
+        print(f"Unexpected error processing {url}: {str(e)}")
+    finally:
+        # Always report back exactly once, even if the error handling above
+        # raised, so the pipeline never waits on this URL forever.
+        if not downloaded:
+            pdf.close()
+            pdf = None
+        # Blocks while the queue is full, which keeps downloads from running
+        # far ahead of parsing.
+        ready.put((url, pdf))
+
+
+def _reset_aryn_breaker() -> None:
+    """Closes the Aryn circuit breaker so parsing is attempted again."""
+    global _aryn_failures
+    with _aryn_lock:
+        _aryn_failures = 0
+        _ARYN_TRIPPED.clear()
+
+
+def _partition(url: str, pdf: BinaryIO) -> Optional[str]:
+    """Converts a PDF to markdown, failing fast while Aryn looks unavailable.
+
+    Args:
+        url: URL the PDF was downloaded from, used in error messages.
+        pdf: File object containing the PDF.
+
+    Returns:
+        The markdown content, or None if parsing failed or was skipped.
+    """
+    global _aryn_failures
+    if _ARYN_TRIPPED.is_set():
+        return None
+
+    try:
+        # Convert PDF to markdown; Aryn returns a dict with "status" and
+        # "markdown" keys.
+        markdown = partition_file(
+            pdf,
+            output_format="markdown",
+            filename=url.rstrip("/").rsplit("/", 1)[-1] or "upload",
+        )["markdown"]
+    except Exception as e:
+        print(f"Unexpected error processing {url}: {str(e)}")
+        with _aryn_lock:
+            _aryn_failures += 1
+            if _aryn_failures >= _ARYN_MAX_FAILURES and not _ARYN_TRIPPED.is_set():
+                _ARYN_TRIPPED.set()
+                print(f"Aryn failed {_aryn_failures} times in a row; skipping parsing "
+                      f"for {_ARYN_RESET_SECONDS} seconds.")
+                timer = threading.Timer(_ARYN_RESET_SECONDS, _reset_aryn_breaker)
+                timer.daemon = True
+                timer.start()
+        return None
+
+    with _aryn_lock:
+        _aryn_failures = 0
+    return markdown
+
+
+def _parse_worker(ready: queue.Queue, done: queue.Queue, stop: threading.Event) -> None:
+    """Converts downloaded PDFs to markdown until it receives a None sentinel.
+
+    Every item taken from `ready` is reported on `done`, even if parsing
+    raises; the first such error is re-raised once the worker is stopped.
+
+    Args:
+        ready: Queue of `(url, pdf)` pairs produced by `_download`.
+        done: Queue receiving `(url, markdown)` pairs. `markdown` is None if
+            downloading or parsing failed.
+        stop: Once set, remaining PDFs are discarded without parsing.
+    """
+    error = None
+    while True:
+        item = ready.get()
+        if item is None:
+            if error is not None:
+                raise error
+            return
+
+        url, pdf = item
+        markdown = None
+        try:
+            if pdf is not None and not stop.is_set():
+                markdown = _partition(url, pdf)
+        except Exception as e:
+            if error is None:
+                error = e
+        finally:
+            if pdf is not None:
+                pdf.close()
+            done.put((url, markdown))
+
 
 def get_pdf_markdown(urls: List[str],
-                     cache_dir: str = ".cache") -> List[Dict[str, str]]:
+                     cache_dir: str = ".cache",
+                     max_workers: int = 8,
+                     parse_workers: int = 4,
+                     max_ready: int = 32) -> List[Dict[str, str]]:
     """Downloads PDFs from URLs, converts them to markdown, and caches the results.
 
+    Uncached PDFs go through a pipeline: a pool of download threads feeds a
+    bounded queue that a separate pool of parse threads consumes, so downloads
+    and Aryn calls overlap.
+
     Args:
         urls: List of URLs pointing to PDF files.
-        cache_dir: Directory to store cached markdown files. Defaults to ".cache".
-        
+        cache_dir: Directory holding the markdown cache database. Defaults to ".cache".
+        max_workers: Maximum number of concurrent downloads, capped at the
+            session's connection pool size (16). Defaults to 8.
+        parse_workers: Maximum number of concurrent Aryn calls. Defaults to 4.
+        max_ready: Maximum number of downloaded PDFs waiting to be parsed.
+            Defaults to 32.
+
     Returns:
-        Dictionary mapping URLs to their markdown content.
+        List of dictionaries with the URL and markdown content, in the order of `urls`.
     """
-    # Create cache directory if it doesn't exist
-    cache_path = Path(cache_dir)
-    cache_path.mkdir(exist_ok=True)
+    # Each unique URL is fetched and parsed once; duplicates share the result.
+    results = {}
+    pending = []
 
-    results = []
-
-    for url in urls:
-        # Create hash of URL for cache filename
-        url_hash = hashlib.sha256(url.encode()).hexdigest()
-        cache_file = cache_path / f"{url_hash}.json"
-
-        # Check if cached version exists
-        if cache_file.exists():
-            with open(cache_file, "r") as f:
-                cached_data = json.load(f)
-                results.append({
-                    "url": url,
-                    "markdown": cached_data["markdown"]
-                })
-            continue
-
-        # Download PDF if not cached
-        max_retries = 3
-        retry_delay = 1  # seconds
-
-        for attempt in range(max_retries):
-            try:
-                response = requests.get(url, timeout=30)  # 30 second timeout
-                response.raise_for_status()
-                
-                # Convert PDF to markdown
-                markdown = partition_file(response.content, output_format="markdown")
-                
-                # Cache the results
-                with open(cache_file, "w") as f:
-                    json.dump({
-                        "url": url,
-                        "markdown": markdown
-                    }, f)
-                    
-                results.append({
-                    "url": url,
-                    "markdown": markdown
-                })
-                break  # Success, exit retry loop
-
-            except (Timeout, ConnectionError) as e:
-                if attempt < max_retries - 1:
-                    print(f"Network error processing {url} (attempt {attempt + 1}/{max_retries}): {str(e)}")
-                    time.sleep(retry_delay * (attempt + 1))  # Exponential backoff
-                    continue
-                else:
-                    print(f"Failed to download {url} after {max_retries} attempts: {str(e)}")
-                    results.append({
-                        "url": url,
-                        "markdown": ""
-                    })
-            except RequestException as e:
-                print(f"Request error processing {url}: {str(e)}")
-                results.append({
-                    "url": url,
-                    "markdown": ""
-                })
-                break  # Don't retry for non-network errors
-            except Exception as e:
-                print(f"Unexpected error processing {url}: {str(e)}")
-                results.append({
-                    "url": url,
-                    "markdown": ""
-                })
-                break  # Don't retry for unexpected errors
-
-    return results
+    # The cache is only read and written from this thread; workers just
+    # download and parse.
+    with closing(_open_cache(cache_dir)) as conn:
+        for url in dict.fromkeys(urls):
+            row = conn.execute(
+                "SELECT markdown FROM md WHERE url_hash = ?", (_url_key(url),)
+            ).fetchone()
+            if row is None:
+                pending.append(url)
+                continue
+
+            results[url] = {
+                "url": url,
+                "markdown": _DCTX.decompress(row[0]).decode("utf-8")
+            }
+
+        if pending:
+            ready = queue.Queue(maxsize=max_ready)
+            done = queue.Queue()
+            num_parsers = min(len(pending), parse_workers)
+            num_downloaders = min(len(pending), max_workers, _POOL_SIZE)
+
+            stop = threading.Event()
+
+            with ThreadPoolExecutor(max_workers=num_parsers) as parse_pool:
+                parse_futures = [
+                    parse_pool.submit(_parse_worker, ready, done, stop)
+                    for _ in range(num_parsers)
+                ]
+                try:
+                    with ThreadPoolExecutor(max_workers=num_downloaders) as dl_pool:
+                        dl_futures = [dl_pool.submit(_download, url, ready) for url in pending]
+                        try:
+                            for _ in pending:
+                                url, markdown = done.get()
+
+                                # Cache the results; failures are retried on the next run.
+                                if markdown is not None:
+                                    with conn:
+                                        conn.execute(
+                                            "INSERT OR REPLACE INTO md (url_hash, markdown) VALUES (?, ?)",
+                                            (_url_key(url), _CCTX.compress(markdown.encode("utf-8"))),
+                                        )
+
+                                results[url] = {
+                                    "url": url,
+                                    "markdown": markdown or ""
+                                }
+                        except BaseException:
+                            # Drop downloads that haven't started and let the parse
+                            # workers discard the rest, so in-flight downloads blocked
+                            # on the full queue can finish.
+                            stop.set()
+                            dl_pool.shutdown(wait=False, cancel_futures=True)
+                            raise
+                finally:
+                    # All downloads have reported back (or been cancelled); stop
+                    # the parse workers.
+                    for _ in range(num_parsers):
+                        ready.put(None)
+
+            # Surface errors raised inside the workers.
+            for future in dl_futures + parse_futures:
+                future.result()
+
+    return [results[url] for url in urls]
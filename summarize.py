@@ -16,7 +16,7 @@ python summarize.py --pdf https://arxiv.org/pdf/2501.12948
 python summarize.py --pdf https://arxiv.org/pdf/2501.12948 --pdf https://arxiv.org/pdf/2403.04642
 
 # Summarize multiple PDFs using comma-separated list
-python summarize.py --pdf https://arxiv.org/pdf/2501.12948,https://arxiv.org/pdf/2403.04642
+python summarize.py --pdf-list https://arxiv.org/pdf/2501.12948,https://arxiv.org/pdf/2403.04642
 ```
 
 """
@@ -44,6 +44,13 @@ _DEFAULT_PDFS = [
     "https://arxiv.org/pdf/2410.01679",  # VinePPO
 ]
 
+# Fixed part of the prompt; the paper text is appended to it.
+_PROMPT_PREFIX = textwrap.dedent("""
+    Extract information from the text of a paper.
+
+    Text of the paper is:
+""").lstrip()
+
 
 class ConceptExplanation(BaseModel):
     concept: str = Field(description="Technical term or concept from the paper")
@@ -111,12 +118,7 @@ class PaperSummarizer(curator.LLM):
 
     def prompt(self, input: Dict) -> str:
         """Prompt for the LLM."""
-        return textwrap.dedent(f"""
-            Extract information from the text of a paper.
-
-            Text of the paper is:
-            {input['markdown']}
-        """).strip()
+        return _PROMPT_PREFIX + input["markdown"]
     
     def parse(self, input: Dict, response: PaperResponse) -> List[Dict]:
         """Parse the model response into structured summaries.
@@ -130,7 +132,7 @@ class PaperSummarizer(curator.LLM):
         """
         result = {}
         result["url"] = input["url"]
-        result.update(response.model_dump())
+        result.update(response.model_dump(mode="python", warnings=False))
         return [result]
         
 
@@ -139,17 +141,35 @@ if __name__ == "__main__":
     parser.add_argument(
         "--pdf",
         type=str,
-        default=",".join(_DEFAULT_PDFS),
-        help=("URL(s) of the PDF(s) to summarize. Can be specified multiple times or as comma-separated list. "
-              "If not specified, uses default set of papers.")
+        action="append",
+        default=None,
+        help=("URL of a PDF to summarize. Can be specified multiple times. "
+              "If neither --pdf nor --pdf-list is given, uses default set of papers.")
+    )
+    parser.add_argument(
+        "--pdf-list",
+        type=str,
+        default=None,
+        help="Comma-separated list of PDF URLs to summarize, in addition to any --pdf."
     )
     args = parser.parse_args()
 
-    # Split the comma-separated URLs and strip whitespace
-    pdf_urls = [url.strip() for url in args.pdf.split(",")]
+    pdf_urls = list(args.pdf or [])
+    if args.pdf_list:
+        # Split the comma-separated URLs and strip whitespace
+        pdf_urls.extend(url.strip() for url in args.pdf_list.split(",") if url.strip())
+    if not pdf_urls:
+        pdf_urls = _DEFAULT_PDFS
     texts = get_pdf_markdown(pdf_urls)
+    # Papers are summarized concurrently; keep the limits below Anthropic's
+    # per-model rate limits to avoid 429s.
     summarizer = PaperSummarizer(
-        model_name="claude-sonnet-4-20250514", backend="litellm")
+        model_name="claude-sonnet-4-20250514",
+        backend="litellm",
+        backend_params={
+            "max_requests_per_minute": 50,
+            "max_concurrent_requests": 8,
+        })
     summaries_response = summarizer(texts)
 
     viewer_url = push_to_viewer(summaries_response.dataset)